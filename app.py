@@ -3,16 +3,29 @@ AI Shopping Assistant REST API with Authentication
 Endpoints: Login, Health, Products, Cart, Chat
 """
 
+import re
 import json
+import math
+import hashlib
 import oci
+import orjson
 import time
+import logging
+import itertools
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pathlib import Path
 from flask import Flask, request, jsonify
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 from datetime import datetime
-from functools import wraps
-from collections import defaultdict
+from functools import wraps, lru_cache
+from collections import defaultdict, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
 
 
 # ------------------------------------------------------------
@@ -39,34 +52,96 @@ class ConfigLoader:
         return value
 
 
+# ------------------------------------------------------------
+# ORDS HTTP Session
+# ------------------------------------------------------------
+def create_ords_session():
+    """Shared keep-alive session so ORDS calls reuse TCP/TLS connections"""
+    session = requests.Session()
+    retries = Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+ords_session = create_ords_session()
+
+
 # ------------------------------------------------------------
 # Rate Limiter
 # ------------------------------------------------------------
 class RateLimiter:
-    def __init__(self):
-        self.requests = defaultdict(list)
+    """
+    Token bucket per user: a burst of max_requests, refilled evenly over
+    window (so up to about 2 * max_requests - 1 get through in the first
+    window, then max_requests per window).
+    State is in-process, so under multiple gunicorn workers the limits apply
+    per worker.
+    """
+    def __init__(self, sweep_interval=300):
+        self.buckets = {}
+        self._locks = defaultdict(threading.Lock)
         self.limits = {
             'user': {'max_requests': 10, 'window': 60},
             'admin': {'max_requests': 50, 'window': 60}
         }
+        self.sweep_interval = sweep_interval
+        self._last_sweep = time.monotonic()
+        self._sweep_lock = threading.Lock()
     
-    def is_allowed(self, user_id, role):
-        current_time = time.time()
-        limit_config = self.limits.get(role, self.limits['user'])
+    def _sweep_idle(self):
+        """Forget users whose bucket has had time to refill completely"""
+        current_time = time.monotonic()
+        if current_time - self._last_sweep < self.sweep_interval:
+            return
         
-        # Clean old requests
-        self.requests[user_id] = [
-            req_time for req_time in self.requests[user_id]
-            if current_time - req_time < limit_config['window']
-        ]
+        with self._sweep_lock:
+            if current_time - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = current_time
+            
+            # A bucket idle for a full window is full again, same as a new user
+            idle_after = max(limit['window'] for limit in self.limits.values())
+            for user_id, (_, last_refill) in list(self.buckets.items()):
+                if current_time - last_refill >= idle_after:
+                    self.buckets.pop(user_id, None)
+                    self._locks.pop(user_id, None)
+    
+    def is_allowed(self, user_id, role):
+        self._sweep_idle()
         
-        # Check limit
-        if len(self.requests[user_id]) >= limit_config['max_requests']:
-            return False, limit_config
+        limit_config = self.limits.get(role, self.limits['user'])
+        max_requests = limit_config['max_requests']
+        rate = max_requests / limit_config['window']
         
-        # Add new request
-        self.requests[user_id].append(current_time)
-        return True, limit_config
+        with self._locks[user_id]:
+            current_time = time.monotonic()
+            
+            # Refill tokens for the time elapsed since the last request
+            tokens, last_refill = self.buckets.get(user_id, (max_requests, current_time))
+            tokens = min(max_requests, tokens + (current_time - last_refill) * rate)
+            
+            # Check limit; retry_after is when the next token will be in
+            if tokens < 1:
+                self.buckets[user_id] = (tokens, current_time)
+                return False, limit_config, math.ceil((1 - tokens) / rate)
+            
+            # Spend a token for this request
+            self.buckets[user_id] = (tokens - 1, current_time)
+            return True, limit_config, 0
+
+
+# ------------------------------------------------------------
+# API Errors
+# ------------------------------------------------------------
+class APIError(Exception):
+    """Raised from endpoints; rendered as {"success": False, "error": ...}"""
+    def __init__(self, message, status_code=400, payload=None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.payload = payload or {}
 
 
 # ------------------------------------------------------------
@@ -84,37 +159,36 @@ def require_auth(f):
         user_name = request.headers.get('X-User-Name')
         
         if not all([user_id, user_role, user_name]):
-            return jsonify({
-                "success": False,
-                "error": "Missing required authentication headers",
+            raise APIError("Missing required authentication headers", 401, payload={
                 "required_headers": ["X-User-ID", "X-User-Role", "X-User-Name"],
                 "status_code": 401
-            }), 401
+            })
         
         # Validate role
         if user_role not in ['user', 'admin']:
-            return jsonify({
-                "success": False,
-                "error": "Invalid role. Must be 'user' or 'admin'",
+            raise APIError("Invalid role. Must be 'user' or 'admin'", 400, payload={
                 "provided_role": user_role,
                 "valid_roles": ["user", "admin"],
                 "status_code": 400
-            }), 400
+            })
         
         # Check rate limit
-        allowed, limit_config = rate_limiter.is_allowed(user_id, user_role)
+        allowed, limit_config, retry_after = rate_limiter.is_allowed(user_id, user_role)
         if not allowed:
-            retry_after = limit_config['window']
-            return jsonify({
-                "success": False,
-                "error": f"Rate limit exceeded. {user_role.title()}s are limited to {limit_config['max_requests']} requests per minute.",
-                "rate_limit": {
-                    "max_requests": limit_config['max_requests'],
-                    "window": f"{limit_config['window']} seconds",
-                    "retry_after": retry_after
-                },
-                "status_code": 429
-            }), 429
+            raise APIError(
+                f"Rate limit exceeded. {user_role.title()}s get a burst of "
+                f"{limit_config['max_requests']} requests, refilled at "
+                f"{limit_config['max_requests']} per {limit_config['window']} seconds.",
+                429,
+                payload={
+                    "rate_limit": {
+                        "max_requests": limit_config['max_requests'],
+                        "window": f"{limit_config['window']} seconds",
+                        "retry_after": retry_after
+                    },
+                    "status_code": 429
+                }
+            )
         
         # Add user info to request context
         request.user_id = user_id
@@ -130,33 +204,57 @@ def require_auth(f):
 # Product Catalog (ORDS REST API)
 # ------------------------------------------------------------
 class ProductCatalog:
-    def __init__(self, api_url=None):
+    # ORDS columns and the catalog field each one is exposed as
+    COLUMNS = ("product_id", "name", "category", "description", "price", "quantity", "image_url")
+    FIELDS = ("id", "name", "category", "description", "price", "stock", "image_url")
+
+    # Words too common in shopping questions to narrow the catalog down
+    STOP_WORDS = frozenset({
+        "the", "and", "for", "with", "you", "your", "have", "has", "what",
+        "which", "any", "some", "show", "tell", "about", "want", "need",
+        "looking", "find", "can", "could", "would", "please", "recommend",
+        "recommendation", "under", "over", "less", "more", "than", "cheap",
+        "best", "good", "buy", "product", "products", "item", "items",
+        "cart", "price", "stock", "there", "are", "this", "that", "me",
+    })
+    _TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, api_url=None, ttl=30):
         self.api_url = api_url or (
             "https://vsnf5ulr.adb.us-ashburn-1.oraclecloudapps.com/"
             "ords/oci_tech_squad_user/api_v1/products/"
         )
         self.products = []
+        self.products_by_id = {}
+        self._index = {}
         self.last_updated = None
+        self.version = 0
+        self._summary_cache = None
+        self._ttl = ttl
+        self._fetched_at = None
+        self._refresh_lock = threading.Lock()
+        self._refresh_attempts = 0
+        self._refresh_result = False
         self._load_products()
 
     def _load_products(self):
         try:
-            response = requests.get(self.api_url, timeout=10)
+            response = ords_session.get(self.api_url, timeout=10)
             response.raise_for_status()
-            data = response.json()
-
-            self.products = []
-            for p in data.get("items", []):
-                self.products.append({
-                    "id": p.get("product_id"),
-                    "name": p.get("name"),
-                    "category": p.get("category"),
-                    "description": p.get("description"),
-                    "price": p.get("price"),
-                    "stock": p.get("quantity"),
-                    "image_url": p.get("image_url"),
-                })
+            data = orjson.loads(response.content)
+
+            # A missing column comes through as None rather than failing the load
+            columns, fields = self.COLUMNS, self.FIELDS
+            products = [
+                dict(zip(fields, map(p.get, columns))) for p in data.get("items", [])
+            ]
+            self.products_by_id = {p["id"]: p for p in products}
+            self._index = self._build_index(products)
+            self.products = products
+            self._summary_cache = None
+            self.version += 1
             self.last_updated = datetime.now().isoformat()
+            self._fetched_at = time.monotonic()
             return True
 
         except Exception as e:
@@ -166,98 +264,244 @@ class ProductCatalog:
     def refresh(self):
         return self._load_products()
 
+    def _is_stale(self):
+        return self._fetched_at is None or time.monotonic() - self._fetched_at > self._ttl
+
+    def maybe_refresh(self):
+        """Reload products only if the cached copy is older than the TTL"""
+        if not self._is_stale():
+            return True
+        # Single flight: concurrent callers wait for one reload instead of
+        # each hitting ORDS, and share its result, failed or not
+        attempt = self._refresh_attempts
+        with self._refresh_lock:
+            if self._refresh_attempts != attempt:
+                return self._refresh_result
+            if not self._is_stale():
+                return True
+            self._refresh_result = self._load_products()
+            self._refresh_attempts += 1
+            return self._refresh_result
+
     def get_all_products(self):
         return self.products
 
-    def get_products_summary(self):
-        summary = "PRODUCT CATALOG:\n"
-        for p in self.products:
-            summary += (
-                f"- ID: {p['id']}, Name: {p['name']}, "
-                f"Category: {p['category']}, "
-                f"Price: ${p['price']}, Stock: {p['stock']}, "
-                f"Description: {p['description']}\n"
+    @classmethod
+    def _tokenize(cls, text):
+        """Lowercase word set with a naive plural strip ("phones" -> "phone")"""
+        tokens = set()
+        for token in cls._TOKEN_RE.findall(str(text or "").lower()):
+            if len(token) < 3 or token in cls.STOP_WORDS:
+                continue
+            if len(token) > 3 and token.endswith("s"):
+                token = token[:-1]
+            tokens.add(token)
+        return tokens
+
+    @classmethod
+    def _build_index(cls, products):
+        """Inverted index: token -> set of product ids"""
+        index = defaultdict(set)
+        for p in products:
+            text = f"{p['name']} {p['category']} {p['description']}"
+            for token in cls._tokenize(text):
+                index[token].add(p["id"])
+        return dict(index)
+
+    def search(self, query):
+        """Ids of products sharing a word with the query (empty if none)"""
+        index = self._index
+        matches = set()
+        for token in self._tokenize(query):
+            matches |= index.get(token, set())
+        return frozenset(matches)
+
+    @staticmethod
+    def _format_product(p):
+        return (
+            f"- ID: {p['id']}, Name: {p['name']}, "
+            f"Category: {p['category']}, "
+            f"Price: ${p['price']}, Stock: {p['stock']}, "
+            f"Description: {p['description']}\n"
+        )
+
+    def get_products_summary(self, product_ids=None):
+        """
+        Catalog text for the system prompt. The full catalog is rebuilt only
+        after a reload; pass product_ids to list just those products.
+        """
+        if product_ids is not None:
+            # Look the matches up by id (in id order) instead of scanning the
+            # catalog; ids dropped by a reload in the meantime are skipped
+            by_id = self.products_by_id
+            return "PRODUCT CATALOG:\n" + "".join(
+                self._format_product(by_id[product_id])
+                for product_id in sorted(product_ids)
+                if product_id in by_id
             )
-        return summary
+        if self._summary_cache is None:
+            self._summary_cache = "PRODUCT CATALOG:\n" + "".join(
+                self._format_product(p) for p in self.products
+            )
+        return self._summary_cache
 
 
 # ------------------------------------------------------------
 # Shopping Cart (ORDS REST API)
 # ------------------------------------------------------------
 class ShoppingCart:
-    def __init__(self, api_url=None):
+    # ORDS columns kept for each cart row
+    COLUMNS = ("cart_item_id", "product_id", "name", "price", "quantity", "image_url")
+
+    def __init__(self, api_url=None, ttl=30):
         self.api_url = api_url or (
             "https://vsnf5ulr.adb.us-ashburn-1.oraclecloudapps.com/"
             "ords/oci_tech_squad_user/api_v1/cart/"
         )
         self.cart_items = {}
         self.last_updated = None
+        self.version = 0
+        self._totals = {}
+        self._summary_cache = {}
+        self._ttl = ttl
+        self._fetched_at = None
+        self._refresh_lock = threading.Lock()
+        self._refresh_attempts = 0
+        self._refresh_result = False
         self._load_cart()
 
     def _load_cart(self):
         try:
-            response = requests.get(self.api_url, timeout=10)
+            response = ords_session.get(self.api_url, timeout=10)
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
             
-            # Group cart items by user_id
-            self.cart_items = {}
-            for item in data.get("items", []):
-                user_id = str(item.get("user_id", "0"))
-                if user_id not in self.cart_items:
-                    self.cart_items[user_id] = []
-                self.cart_items[user_id].append({
-                    "cart_item_id": item.get("cart_item_id"),
-                    "product_id": item.get("product_id"),
-                    "name": item.get("name"),
-                    "price": item.get("price"),
-                    "quantity": item.get("quantity"),
-                    "image_url": item.get("image_url")
-                })
+            # Group cart items by user_id (stable sort keeps each user's item order)
+            items = sorted(data.get("items", []), key=self._item_user_id)
+            columns = self.COLUMNS
+            cart_items = {
+                user_id: [dict(zip(columns, map(item.get, columns))) for item in group]
+                for user_id, group in itertools.groupby(items, key=self._item_user_id)
+            }
             
+            # Totals only change on reload, so compute them once here
+            line_total = self._line_total
+            self._totals = {
+                user_id: sum(line_total(item) for item in user_items)
+                for user_id, user_items in cart_items.items()
+            }
+            self.cart_items = cart_items
+            self._summary_cache = {}
+            self.version += 1
             self.last_updated = datetime.now().isoformat()
+            self._fetched_at = time.monotonic()
             return True
         except Exception as e:
             print(f"Cart API error: {e}")
             return False
 
+    @staticmethod
+    def _line_total(item):
+        """price * quantity, counting a null price or quantity as 0"""
+        return (item['price'] or 0) * (item['quantity'] or 0)
+
+    @staticmethod
+    def _item_user_id(item):
+        return str(item.get("user_id", "0"))
+
     def refresh(self):
         return self._load_cart()
 
+    def _is_stale(self):
+        return self._fetched_at is None or time.monotonic() - self._fetched_at > self._ttl
+
+    def maybe_refresh(self):
+        """Reload cart only if the cached copy is older than the TTL"""
+        if not self._is_stale():
+            return True
+        # Single flight: concurrent callers wait for one reload instead of
+        # each hitting ORDS, and share its result, failed or not
+        attempt = self._refresh_attempts
+        with self._refresh_lock:
+            if self._refresh_attempts != attempt:
+                return self._refresh_result
+            if not self._is_stale():
+                return True
+            self._refresh_result = self._load_cart()
+            self._refresh_attempts += 1
+            return self._refresh_result
+
     def get_user_cart(self, user_id):
         """Get cart items for specific user"""
         return self.cart_items.get(str(user_id), [])
 
     def get_cart_summary(self, user_id):
-        """Get cart summary for specific user"""
+        """Get cart summary for specific user (cached until the next reload)"""
+        user_id = str(user_id)
+        summary = self._summary_cache.get(user_id)
+        if summary is None:
+            summary = self._summary_cache[user_id] = self._build_cart_summary(user_id)
+        return summary
+
+    def _build_cart_summary(self, user_id):
         items = self.get_user_cart(user_id)
         
         if not items:
             return "CART: Empty"
         
-        summary = "CURRENT CART:\n"
-        total = 0
-        for item in items:
-            item_total = item['price'] * item['quantity']
-            total += item_total
-            summary += (
-                f"- {item['name']}: "
-                f"${item['price']} x {item['quantity']} = ${item_total:.2f}\n"
-            )
-        summary += f"\nTotal: ${total:.2f}"
-        return summary
+        parts = ["CURRENT CART:\n"]
+        parts.extend(
+            f"- {item['name']}: "
+            f"${item['price']} x {item['quantity']} = ${self._line_total(item):.2f}\n"
+            for item in items
+        )
+        parts.append(f"\nTotal: ${self.get_cart_total(user_id):.2f}")
+        return "".join(parts)
 
     def get_cart_count(self, user_id):
         return len(self.get_user_cart(user_id))
 
     def get_cart_total(self, user_id):
-        items = self.get_user_cart(user_id)
-        return sum(item['price'] * item['quantity'] for item in items)
+        return self._totals.get(str(user_id), 0)
+
+
+# ------------------------------------------------------------
+# Chat Response Cache
+# ------------------------------------------------------------
+class ResponseCache:
+    """Thread-safe LRU of chat responses with a per-entry TTL"""
+    def __init__(self, maxsize=512, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
 
 
 # ------------------------------------------------------------
 # Shopping Assistant (OCI GenAI)
 # ------------------------------------------------------------
+# Cart and catalog refreshes are independent ORDS calls, run them side by side
+refresh_pool = ThreadPoolExecutor(max_workers=4)
+
 class ShoppingAssistant:
     def __init__(self, config_path="config.json"):
         self.cfg = ConfigLoader(config_path)
@@ -279,14 +523,29 @@ class ShoppingAssistant:
             ),
         )
 
-    def _build_system_prompt(self, user_id):
+        # System prompts keyed by (catalog version, cart version, user_id,
+        # matched products); a reload bumps a version, so stale prompts
+        # simply stop being hit
+        self._prompt_cache = lru_cache(maxsize=256)(self._render_system_prompt)
+        self._response_cache = ResponseCache()
+        self._extract = None
+
+    def _build_system_prompt(self, user_id, user_message):
+        # Only embed products relevant to the question; fall back to the
+        # whole catalog when nothing matches (e.g. "what do you sell?")
+        product_ids = self.catalog.search(user_message) or None
+        return self._prompt_cache(
+            self.catalog.version, self.cart.version, str(user_id), product_ids
+        )
+
+    def _render_system_prompt(self, catalog_version, cart_version, user_id, product_ids):
         return f"""You are a helpful shopping assistant that can:
 1. Recommend products from the catalog
 2. Answer questions about products (price, description, stock)
 3. Provide information about the user's shopping cart
 4. Help with general shopping queries
 
-{self.catalog.get_products_summary()}
+{self.catalog.get_products_summary(product_ids)}
 
 {self.cart.get_cart_summary(user_id)}
 
@@ -308,7 +567,7 @@ RESPONSE RULES:
                 role=oci.generative_ai_inference.models.Message.ROLE_SYSTEM,
                 content=[
                     oci.generative_ai_inference.models.TextContent(
-                        text=self._build_system_prompt(user_id)
+                        text=self._build_system_prompt(user_id, user_message)
                     )
                 ],
             )
@@ -370,27 +629,39 @@ RESPONSE RULES:
             compartment_id=self.cfg.get("oci", "compartment_id"),
         )
 
+    @staticmethod
+    def _extract_from_chat_response(data):
+        return (
+            data.chat_response
+            .choices[0]
+            .message
+            .content[0]
+            .text
+            .strip()
+        )
+
+    @staticmethod
+    def _extract_from_choices(data):
+        return (
+            data.choices[0]
+            .message
+            .content[0]
+            .text
+            .strip()
+        )
+
     def _extract_response_text(self, chat_response):
         data = chat_response.data
 
-        if hasattr(data, "chat_response"):
-            return (
-                data.chat_response
-                .choices[0]
-                .message
-                .content[0]
-                .text
-                .strip()
-            )
+        # The response shape is fixed per client, so pick the accessor once
+        if self._extract is None:
+            if hasattr(data, "chat_response"):
+                self._extract = self._extract_from_chat_response
+            elif hasattr(data, "choices"):
+                self._extract = self._extract_from_choices
 
-        if hasattr(data, "choices"):
-            return (
-                data.choices[0]
-                .message
-                .content[0]
-                .text
-                .strip()
-            )
+        if self._extract is not None:
+            return self._extract(data)
 
         try:
             payload = json.loads(str(data))
@@ -402,37 +673,73 @@ RESPONSE RULES:
         except Exception:
             return str(data)
 
-    def refresh_data(self):
-        """Refresh cart and catalog data"""
-        cart_success = self.cart.refresh()
-        catalog_success = self.catalog.refresh()
-        return cart_success and catalog_success
-
-    def get_response(self, user_message, history, user_id):
-        # Refresh data before each query
-        self.refresh_data()
+    def refresh_data(self, force=False):
+        """Refresh cart and catalog data (only when stale unless forced)"""
+        stores = (self.cart, self.catalog)
+        if force:
+            loads = [store.refresh for store in stores]
+        else:
+            # Usually both copies are fresh, so skip the pool entirely
+            loads = [store.maybe_refresh for store in stores if store._is_stale()]
+        futures = [refresh_pool.submit(load) for load in loads]
+        return all([future.result() for future in futures])
+
+    def _response_cache_key(self, user_message, history, user_id):
+        payload = orjson.dumps([
+            user_message, history, str(user_id),
+            self.catalog.version, self.cart.version,
+        ])
+        return hashlib.blake2b(payload, digest_size=16).digest()
+
+    def get_response(self, user_message, history, user_id, force_refresh=False):
+        # Refresh data if the cached copy is stale (or a reload was requested)
+        self.refresh_data(force=force_refresh)
+        
+        # Debug: Log history to see what roles we're receiving
+        logger.debug("History received: %s", history)
+        
+        start = time.perf_counter()
         
-        # Debug: Print history to see what roles we're receiving
-        print(f"DEBUG - History received: {history}")
+        # Identical question against the same catalog/cart data: skip OCI
+        cache_key = self._response_cache_key(user_message, history, user_id)
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            return cached, time.perf_counter() - start
         
-        start = time.time()
         chat_request = self._build_chat_request(user_message, history, user_id)
         
-        # Debug: Print the messages being sent
-        print(f"DEBUG - Messages being sent to OCI:")
-        for i, msg in enumerate(chat_request.messages):
-            print(f"  Message {i}: role={msg.role}")
+        # Debug: Log the messages being sent
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Messages being sent to OCI:")
+            for i, msg in enumerate(chat_request.messages):
+                logger.debug("  Message %d: role=%s", i, msg.role)
         
         chat_detail = self._build_chat_detail(chat_request)
         response = self.client.chat(chat_detail)
-        elapsed = time.time() - start
-        return self._extract_response_text(response), elapsed
+        response_text = self._extract_response_text(response)
+        self._response_cache.set(cache_key, response_text)
+        elapsed = time.perf_counter() - start
+        return response_text, elapsed
 
 
 # ------------------------------------------------------------
 # Flask REST API
 # ------------------------------------------------------------
+class OrjsonProvider(JSONProvider):
+    """Route jsonify() and request.get_json() through orjson"""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype="application/json")
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
 # Global assistant instance
@@ -448,6 +755,11 @@ def init_assistant():
         return False
 
 
+def require_assistant():
+    if not assistant:
+        raise APIError("Assistant not initialized", 500)
+
+
 # ------------------------------------------------------------
 # API Endpoints
 # ------------------------------------------------------------
@@ -465,111 +777,86 @@ def health_check():
 @app.route('/api/auth/login', methods=['POST'])
 def login():
     """Login endpoint - authenticates user against ORDS API"""
+    data = request.get_json(silent=True)
+    
+    if not data or 'username' not in data or 'password' not in data:
+        raise APIError("Missing 'username' or 'password' in request body", 400)
+
+    # Call ORDS login API
+    login_url = (
+        "https://vsnf5ulr.adb.us-ashburn-1.oraclecloudapps.com/"
+        "ords/oci_tech_squad_user/api_v1/login"
+    )
+    
+    login_payload = {
+        "username": data['username'],
+        "password": data['password']
+    }
+    
+    headers = {
+        "Content-Type": "application/json",
+        "Accept": "application/json"
+    }
+    
     try:
-        data = request.get_json()
-        
-        if not data or 'username' not in data or 'password' not in data:
-            return jsonify({
-                "success": False,
-                "error": "Missing 'username' or 'password' in request body"
-            }), 400
-
-        # Call ORDS login API
-        login_url = (
-            "https://vsnf5ulr.adb.us-ashburn-1.oraclecloudapps.com/"
-            "ords/oci_tech_squad_user/api_v1/login"
-        )
-        
-        login_payload = {
-            "username": data['username'],
-            "password": data['password']
-        }
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
-        
-        response = requests.post(login_url, json=login_payload, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            login_data = response.json()
-            
-            return jsonify({
-                "success": True,
-                "userId": login_data.get("userId"),
-                "userName": login_data.get("userName"),
-                "role": login_data.get("role"),
-                "message": "Login successful",
-                "timestamp": datetime.now().isoformat()
-            })
-        else:
-            return jsonify({
-                "success": False,
-                "error": "Invalid username or password",
-                "status_code": response.status_code
-            }), 401
-
+        response = ords_session.post(login_url, json=login_payload, headers=headers, timeout=10)
+        login_data = response.json() if response.status_code == 200 else None
     except requests.exceptions.Timeout:
-        return jsonify({
-            "success": False,
-            "error": "Login API timeout"
-        }), 504
+        raise APIError("Login API timeout", 504)
     except requests.exceptions.RequestException as e:
-        return jsonify({
-            "success": False,
-            "error": f"Login API error: {str(e)}"
-        }), 500
+        raise APIError(f"Login API error: {str(e)}", 500)
     except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": str(e)
-        }), 500
+        raise APIError(str(e), 500)
+
+    if login_data is None:
+        raise APIError(
+            "Invalid username or password", 401,
+            payload={"status_code": response.status_code}
+        )
+
+    return jsonify({
+        "success": True,
+        "userId": login_data.get("userId"),
+        "userName": login_data.get("userName"),
+        "role": login_data.get("role"),
+        "message": "Login successful",
+        "timestamp": datetime.now().isoformat()
+    })
 
 
 @app.route('/api/products', methods=['GET'])
 @require_auth
 def get_products():
     """Get all products (requires auth)"""
-    try:
-        if not assistant:
-            return jsonify({
-                "success": False,
-                "error": "Assistant not initialized"
-            }), 500
+    require_assistant()
+    should_refresh = request.args.get('refresh', 'false').lower() == 'true'
 
-        should_refresh = request.args.get('refresh', 'false').lower() == 'true'
-        
+    try:
         if should_refresh:
             assistant.catalog.refresh()
 
-        return jsonify({
+        response = jsonify({
             "success": True,
             "products": assistant.catalog.get_all_products(),
             "count": len(assistant.catalog.get_all_products()),
             "last_updated": assistant.catalog.last_updated
         })
+        # Lets clients revalidate with If-None-Match and get a bodiless 304
+        response.add_etag()
+        return response.make_conditional(request)
 
     except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": str(e)
-        }), 500
+        raise APIError(str(e), 500)
 
 
 @app.route('/api/cart', methods=['GET'])
 @require_auth
 def get_cart():
     """Get user's cart (requires auth)"""
-    try:
-        if not assistant:
-            return jsonify({
-                "success": False,
-                "error": "Assistant not initialized"
-            }), 500
+    require_assistant()
+    should_refresh = request.args.get('refresh', 'false').lower() == 'true'
 
-        should_refresh = request.args.get('refresh', 'false').lower() == 'true'
-        
+    try:
         if should_refresh:
             assistant.cart.refresh()
 
@@ -583,38 +870,29 @@ def get_cart():
         })
 
     except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": str(e)
-        }), 500
+        raise APIError(str(e), 500)
 
 
 @app.route('/api/chat', methods=['POST'])
 @require_auth
 def chat():
     """Chat endpoint - AI shopping assistant (requires auth)"""
-    try:
-        if not assistant:
-            return jsonify({
-                "success": False,
-                "error": "Assistant not initialized"
-            }), 500
-
-        data = request.get_json()
-        
-        if not data or 'message' not in data:
-            return jsonify({
-                "success": False,
-                "error": "Missing 'message' in request body"
-            }), 400
+    require_assistant()
+    data = request.get_json(silent=True)
+    
+    if not data or 'message' not in data:
+        raise APIError("Missing 'message' in request body", 400)
 
-        user_message = data['message']
-        history = data.get('history', [])
+    user_message = data['message']
+    history = data.get('history', [])
+    should_refresh = request.args.get('refresh', 'false').lower() == 'true'
 
+    try:
         response_text, elapsed = assistant.get_response(
             user_message, 
             history, 
-            request.user_id
+            request.user_id,
+            force_refresh=should_refresh
         )
 
         return jsonify({
@@ -625,16 +903,22 @@ def chat():
         })
 
     except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": str(e)
-        }), 500
+        raise APIError(str(e), 500)
 
 
 # ------------------------------------------------------------
 # Error Handlers
 # ------------------------------------------------------------
 
+@app.errorhandler(APIError)
+def api_error(error):
+    return jsonify({
+        "success": False,
+        "error": error.message,
+        **error.payload
+    }), error.status_code
+
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({
@@ -673,10 +957,12 @@ if __name__ == '__main__':
         print("  GET  /api/cart")
         print("  POST /api/chat")
         print("\nRate Limits:")
-        print("  User:  10 requests/minute")
-        print("  Admin: 50 requests/minute")
+        print("  User:  burst of 10, refilled at 10/minute")
+        print("  Admin: burst of 50, refilled at 50/minute")
         print("=" * 60)
         
+        # Development server only; in production run:
+        #   gunicorn -c gunicorn.conf.py wsgi:app
         app.run(host='0.0.0.0', port=5000, debug=False)
     else:
         print("✗ Failed to initialize assistant")
@@ -0,0 +1,16 @@
+"""
+Gunicorn settings for the Shopping Assistant API
+Chat requests spend seconds waiting on OCI GenAI, so gevent workers are used
+to keep many requests in flight per process (gunicorn monkey-patches
+sockets/ssl for gevent workers, so requests to ORDS yield as well).
+"""
+
+import multiprocessing
+
+bind = "0.0.0.0:5000"
+worker_class = "gevent"
+workers = multiprocessing.cpu_count()
+worker_connections = 100
+
+# Must exceed the OCI read_timeout in config.json (240s)
+timeout = 300
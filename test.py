@@ -3,8 +3,19 @@ Test script for Shopping Assistant API endpoints
 Tests: Health, Login, Products, Cart, Chat
 """
 
-import requests
+import io
+import os
+import sys
 import json
+import base64
+import hashlib
+import threading
+from pathlib import Path
+import requests
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Configuration
 BASE_URL = "http://localhost:5000"
@@ -13,8 +24,231 @@ TEST_USER = {
     "password": "Welcome@123"
 }
 
-# Store auth info
-auth_headers = {}
+# Output mode, fixed at import: "tty" pretty-prints each response, "ci"
+# prints one status line per response, "quiet" adds a body fingerprint to
+# that line, "silent" prints none. Defaults to tty for a terminal and ci
+# otherwise; override with API_TEST_MODE.
+MODE = os.environ.get("API_TEST_MODE") or ("tty" if sys.stdout.isatty() else "ci")
+
+# API_TEST_FAST=1 stops the chat test after the basic query (skips 5c/5d)
+FAST = bool(os.environ.get("API_TEST_FAST"))
+
+# Use orjson for response bodies when it is installed, stdlib json otherwise
+try:
+    import orjson
+
+    def parse_json(response):
+        return orjson.loads(response.content)
+
+    def dump_json(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2, default=str).decode()
+
+    def encode_json(obj):
+        return orjson.dumps(obj)
+except ImportError:
+    def parse_json(response):
+        return response.json()
+
+    def dump_json(obj):
+        return json.dumps(obj, indent=2, ensure_ascii=False, default=str)
+
+    def encode_json(obj):
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+# Incremental JSON parsing for large bodies, when ijson is installed
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Bodies at least this big are counted while streaming instead of printed
+STREAM_THRESHOLD = 64 * 1024
+
+# Endpoints and fixed request bodies, built once and sent as raw bytes
+URL_HEALTH = f"{BASE_URL}/api/health"
+URL_LOGIN = f"{BASE_URL}/api/auth/login"
+URL_PRODUCTS = f"{BASE_URL}/api/products"
+URL_CART = f"{BASE_URL}/api/cart"
+URL_CHAT = f"{BASE_URL}/api/chat"
+URL_INVALID = f"{BASE_URL}/api/invalid"
+
+JSON_CONTENT = {"Content-Type": "application/json"}
+BODY_LOGIN = encode_json(TEST_USER)
+BODY_INVALID_LOGIN = encode_json({"username": "invalid", "password": "wrong"})
+BODY_CHAT_HELLO = encode_json({"message": "Hello"})
+BODY_CHAT_PRODUCTS = encode_json({
+    "message": "What products do you have?",
+    "history": []
+})
+BODY_CHAT_RECOMMEND = encode_json({
+    "message": "Recommend me some electronics under $30",
+    "history": []
+})
+
+# Auth info from a successful login, as ((header, value), ...); set once and
+# only read afterwards, so the concurrent tests share it safely
+AUTH = ()
+
+# Auth headers live on SESSION after login; unauthenticated probes pass this
+# to drop them (requests removes headers whose value is None)
+NO_AUTH = {"X-User-ID": None, "X-User-Role": None, "X-User-Name": None}
+
+# ETag cache for conditional GETs (url -> (etag, body)), kept between runs as
+# JSON with base64 bodies
+CACHE_FILE = Path(__file__).with_name(".api_test_cache.json")
+CACHE = {}
+
+# One keep-alive session for the whole run instead of a new connection per call.
+# Gateway errors are retried with backoff on the same pool; 4xx (e.g. the
+# expected 401s) are not, and the last 5xx is returned rather than raised.
+# This stays HTTP/1.1 keep-alive: httpx only negotiates HTTP/2 over TLS, and
+# neither the Flask dev server nor gunicorn's gevent worker speaks HTTP/2.
+SESSION = requests.Session()
+SESSION.headers.update({"Accept": "application/json"})
+_retries = Retry(
+    total=3,
+    backoff_factor=0.25,
+    status_forcelist=(502, 503, 504),
+    allowed_methods=frozenset(["GET", "POST"]),
+    raise_on_status=False
+)
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=_retries)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
+
+class ThreadStdout:
+    """stdout wrapper that lets a worker thread print into its own buffer"""
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def _target(self):
+        return getattr(self.local, "buffer", self.stream)
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        # isatty(), encoding, fileno(), buffer, ... come from the real stream
+        return getattr(self.stream, name)
+
+
+@contextmanager
+def thread_stdout():
+    """Install ThreadStdout as sys.stdout for the run, restoring it after"""
+    original = sys.stdout
+    sys.stdout = ThreadStdout(original)
+    try:
+        yield
+    finally:
+        sys.stdout = original
+
+
+class OutBuf:
+    """In-memory output that reaches stdout in a single write"""
+    def __init__(self):
+        self.buffer = io.StringIO()
+
+    def write(self, text):
+        return self.buffer.write(text)
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return self.buffer.getvalue()
+
+    def dump(self):
+        sys.stdout.write(self.getvalue())
+        sys.stdout.flush()
+
+
+@contextmanager
+def captured_output():
+    """Route this thread's print() calls into an OutBuf"""
+    buf = OutBuf()
+    sys.stdout.local.buffer = buf
+    try:
+        yield buf
+    finally:
+        del sys.stdout.local.buffer
+
+
+def run_captured(test):
+    """Run a test on a worker thread, returning (result, printed output)"""
+    with captured_output() as buf:
+        # An error only fails this test; the others and the report still run
+        try:
+            result = test()
+        except requests.exceptions.RequestException as e:
+            print(f"✗ Request failed: {e}")
+            print(f"Make sure the server is running at {BASE_URL}")
+            result = False
+        except Exception as e:
+            print(f"✗ {type(e).__name__}: {e}")
+            result = False
+        return result, buf.getvalue()
+
+
+def load_cache():
+    try:
+        saved = json.loads(CACHE_FILE.read_bytes())
+        CACHE.update(
+            (url, (etag, base64.b64decode(body))) for url, (etag, body) in saved.items()
+        )
+    except (OSError, ValueError, TypeError, AttributeError):
+        pass
+
+
+def save_cache():
+    try:
+        CACHE_FILE.write_text(json.dumps({
+            url: [etag, base64.b64encode(body).decode()]
+            for url, (etag, body) in CACHE.items()
+        }))
+    except OSError:
+        pass
+
+
+def cached_get(url, headers=None, **kwargs):
+    """
+    GET that revalidates with If-None-Match. A 304 keeps its status but
+    carries the body from CACHE.
+    """
+    cached = CACHE.get(url)
+    headers = dict(headers or {})
+    if cached:
+        headers["If-None-Match"] = cached[0]
+    
+    response = SESSION.get(url, headers=headers, **kwargs)
+    
+    if response.status_code == 304 and cached:
+        # Release the connection before swapping in the cached body
+        response.close()
+        response._content = cached[1]
+        response.headers["Content-Type"] = "application/json"
+    elif response.status_code == 200 and "ETag" in response.headers and not is_large(response):
+        CACHE[url] = (response.headers["ETag"], response.content)
+    return response
+
+
+def is_large(response):
+    return int(response.headers.get("Content-Length", 0)) >= STREAM_THRESHOLD
+
+
+def count_items(response, prefix):
+    """Count the items of a JSON array as the body streams in"""
+    if ijson is None:
+        data = parse_json(response)
+        for key in prefix.split(".")[:-1]:
+            data = data[key]
+        return len(data)
+    response.raw.decode_content = True
+    return sum(1 for _ in ijson.items(response.raw, prefix))
 
 
 def print_section(title):
@@ -23,36 +257,78 @@ def print_section(title):
     print("=" * 60)
 
 
-def print_response(response):
+def _parsed_body(response, parsed=None):
+    """The response's JSON body, or None if it is not JSON"""
+    if parsed is not None:
+        return parsed
+    # Decide from the Content-Type instead of catching a decode error
+    if "application/json" not in response.headers.get("Content-Type", ""):
+        return None
+    return parse_json(response)
+
+
+def _print_pretty(response, parsed=None):
+    """Print status and body; returns the parsed JSON (None if not JSON)"""
     print(f"Status: {response.status_code}")
-    try:
-        print(f"Response: {json.dumps(response.json(), indent=2)}")
-    except:
+    parsed = _parsed_body(response, parsed)
+    if parsed is not None:
+        print(f"Response: {dump_json(parsed)}")
+    else:
         print(f"Response: {response.text}")
     print()
+    return parsed
+
+
+def _print_compact(response, parsed=None):
+    """One line per response; returns the parsed JSON (None if not JSON)"""
+    print(f"Status: {response.status_code} ({len(response.content)}B)")
+    return _parsed_body(response, parsed)
+
+
+def _print_fingerprint(response, parsed=None):
+    """Status, size and a blake2b digest of the raw body, to spot changes"""
+    digest = hashlib.blake2b(response.content, digest_size=8).hexdigest()
+    print(f"Status: {response.status_code} ({len(response.content)}B) {digest}")
+    return _parsed_body(response, parsed)
+
+
+def _print_nothing(response, parsed=None):
+    return _parsed_body(response, parsed)
+
+
+print_response = {
+    "tty": _print_pretty,
+    "ci": _print_compact,
+    "quiet": _print_fingerprint,
+    "silent": _print_nothing
+}.get(MODE, _print_compact)
 
 
 def test_health():
     print_section("1. Testing Health Check")
-    response = requests.get(f"{BASE_URL}/api/health")
+    response = SESSION.get(URL_HEALTH)
     print_response(response)
     return response.status_code == 200
 
 
 def test_login():
+    global AUTH
     print_section("2. Testing Login")
-    response = requests.post(
-        f"{BASE_URL}/api/auth/login",
-        json=TEST_USER
+    response = SESSION.post(
+        URL_LOGIN,
+        data=BODY_LOGIN,
+        headers=JSON_CONTENT
     )
-    print_response(response)
+    data = print_response(response)
     
     if response.status_code == 200:
-        data = response.json()
         if data.get('success'):
-            auth_headers['X-User-ID'] = str(data['userId'])
-            auth_headers['X-User-Role'] = data['role']
-            auth_headers['X-User-Name'] = data['userName']
+            AUTH = (
+                ("X-User-ID", str(data['userId'])),
+                ("X-User-Role", data['role']),
+                ("X-User-Name", data['userName']),
+            )
+            SESSION.headers.update(AUTH)
             print(f"✓ Logged in as: {data['userName']} (Role: {data['role']}, ID: {data['userId']})")
             return True
     
@@ -63,22 +339,31 @@ def test_login():
 def test_products():
     print_section("3. Testing Products Endpoint")
     
+    # The two probes are independent, so send them together
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        unauthed = executor.submit(SESSION.get, URL_PRODUCTS, headers=NO_AUTH)
+        authed = executor.submit(cached_get, URL_PRODUCTS, stream=True)
+    
     # Test without auth (should fail)
     print("3a. Without authentication:")
-    response = requests.get(f"{BASE_URL}/api/products")
-    print_response(response)
+    print_response(unauthed.result())
     
     # Test with auth
     print("3b. With authentication:")
-    response = requests.get(
-        f"{BASE_URL}/api/products",
-        headers=auth_headers
-    )
-    print_response(response)
+    response = authed.result()
     
-    if response.status_code == 200:
-        data = response.json()
-        print(f"✓ Found {data.get('count', 0)} products")
+    # A large catalog is counted as it arrives rather than buffered and dumped
+    if response.status_code == 200 and is_large(response):
+        print(f"Status: {response.status_code}")
+        print(f"Response: <{response.headers['Content-Length']} bytes, streamed>")
+        count = count_items(response, "products.item")
+    else:
+        data = print_response(response)
+        count = data.get('count', 0) if data else 0
+    
+    if response.status_code in (200, 304):
+        source = " (cached)" if response.status_code == 304 else ""
+        print(f"✓ Found {count} products{source}")
         return True
     
     print("✗ Products fetch failed")
@@ -88,28 +373,30 @@ def test_products():
 def test_cart():
     print_section("4. Testing Cart Endpoint")
     
+    # The two probes are independent, so send them together
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        unauthed = executor.submit(SESSION.get, URL_CART, headers=NO_AUTH)
+        authed = executor.submit(SESSION.get, URL_CART)
+    
     # Test without auth (should fail)
     print("4a. Without authentication:")
-    response = requests.get(f"{BASE_URL}/api/cart")
-    print_response(response)
+    print_response(unauthed.result())
     
     # Test with auth
     print("4b. With authentication:")
-    response = requests.get(
-        f"{BASE_URL}/api/cart",
-        headers=auth_headers
-    )
-    print_response(response)
+    response = authed.result()
+    data = print_response(response)
     
     if response.status_code == 200:
-        data = response.json()
         print(f"✓ Cart has {data.get('item_count', 0)} items, Total: ${data.get('total', 0)}")
         
         # Display cart items
         if data.get('cart_items'):
             print("\nCart Items:")
-            for item in data['cart_items']:
-                print(f"  - {item['name']}: ${item['price']} x {item['quantity']}")
+            print("\n".join(
+                f"  - {item['name']}: ${item['price']} x {item['quantity']}"
+                for item in data['cart_items']
+            ))
         
         return True
     
@@ -120,58 +407,64 @@ def test_cart():
 def test_chat():
     print_section("5. Testing Chat Endpoint")
     
-    # Test without auth (should fail)
+    # 5a, 5b and 5d are independent, so send them together; only 5c needs
+    # 5b's answer for its history. Results are printed afterwards in order.
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        # Test without auth (should fail)
+        unauthed = executor.submit(
+            SESSION.post,
+            URL_CHAT,
+            data=BODY_CHAT_HELLO,
+            headers={**JSON_CONTENT, **NO_AUTH}
+        )
+        # Test with auth - simple query
+        simple = executor.submit(
+            SESSION.post,
+            URL_CHAT,
+            data=BODY_CHAT_PRODUCTS,
+            headers=JSON_CONTENT
+        )
+        # Test product recommendation
+        if not FAST:
+            recommend = executor.submit(
+                SESSION.post,
+                URL_CHAT,
+                data=BODY_CHAT_RECOMMEND,
+                headers=JSON_CONTENT
+            )
+    
     print("5a. Without authentication:")
-    response = requests.post(
-        f"{BASE_URL}/api/chat",
-        json={"message": "Hello"}
-    )
-    print_response(response)
+    print_response(unauthed.result())
     
-    # Test with auth - simple query
     print("5b. Simple chat query (What products do you have?):")
-    response = requests.post(
-        f"{BASE_URL}/api/chat",
-        headers=auth_headers,
-        json={
-            "message": "What products do you have?",
-            "history": []
-        }
-    )
-    print_response(response)
+    response = simple.result()
+    data = print_response(response)
     
     if response.status_code == 200:
-        data = response.json()
         print(f"✓ Chat response received in {data.get('response_time', 0)}s")
+        if FAST:
+            return True
         
         # Test with history
         print("5c. Chat with history (What's in my cart?):")
-        response = requests.post(
-            f"{BASE_URL}/api/chat",
-            headers=auth_headers,
-            json={
+        response = SESSION.post(
+            URL_CHAT,
+            data=encode_json({
                 "message": "What's in my cart?",
                 "history": [
                     {"role": "user", "content": "What products do you have?"},
                     {"role": "model", "content": data.get('response', '')}
                 ]
-            }
+            }),
+            headers=JSON_CONTENT
         )
         print_response(response)
         
         if response.status_code == 200:
             print("✓ Chat with history successful")
             
-            # Test product recommendation
             print("5d. Product recommendation:")
-            response = requests.post(
-                f"{BASE_URL}/api/chat",
-                headers=auth_headers,
-                json={
-                    "message": "Recommend me some electronics under $30",
-                    "history": []
-                }
-            )
+            response = recommend.result()
             print_response(response)
             
             return response.status_code == 200
@@ -185,63 +478,100 @@ def test_chat():
 
 def test_invalid_endpoint():
     print_section("6. Testing Invalid Endpoint (404)")
-    response = requests.get(f"{BASE_URL}/api/invalid")
+    response = SESSION.get(URL_INVALID)
     print_response(response)
     return response.status_code == 404
 
 
 def test_invalid_login():
     print_section("7. Testing Invalid Login")
-    response = requests.post(
-        f"{BASE_URL}/api/auth/login",
-        json={"username": "invalid", "password": "wrong"}
+    response = SESSION.post(
+        URL_LOGIN,
+        data=BODY_INVALID_LOGIN,
+        headers=JSON_CONTENT
     )
     print_response(response)
     return response.status_code == 401
 
 
 def run_all_tests():
-    print("\n" + "█" * 60)
-    print(" SHOPPING ASSISTANT API TEST SUITE")
-    print("█" * 60)
-    print(f"\nTesting API at: {BASE_URL}")
-    print(f"Test user: {TEST_USER['username']}")
-    
-    results = {
-        "Health Check": test_health(),
-        "Login (Valid)": test_login(),
-        "Login (Invalid)": test_invalid_login(),
-        "Products": test_products() if auth_headers else False,
-        "Cart": test_cart() if auth_headers else False,
-        "Chat": test_chat() if auth_headers else False,
-        "404 Handling": test_invalid_endpoint()
-    }
-    
-    # Summary
-    print_section("TEST SUMMARY")
-    passed = sum(1 for v in results.values() if v)
-    total = len(results)
-    
-    for test, result in results.items():
-        status = "✓ PASS" if result else "✗ FAIL"
-        print(f"{status:8} | {test}")
-    
-    print("\n" + "-" * 60)
-    print(f"Results: {passed}/{total} tests passed")
-    print("=" * 60 + "\n")
-    
-    if passed == total:
-        print("🎉 All tests passed!")
-    else:
-        print("⚠️  Some tests failed. Check the output above.")
+    with thread_stdout():
+        with captured_output() as banner:
+            print("\n" + "█" * 60)
+            print(" SHOPPING ASSISTANT API TEST SUITE")
+            print("█" * 60)
+            print(f"\nTesting API at: {BASE_URL}")
+            print(f"Test user: {TEST_USER['username']}")
+        banner.dump()
+        
+        tests = {
+            "Health Check": test_health,
+            "Login (Valid)": test_login,
+            "Products": test_products,
+            "Cart": test_cart,
+            "Chat": test_chat,
+            "404 Handling": test_invalid_endpoint,
+            "Login (Invalid)": test_invalid_login
+        }
+        authed = ("Products", "Cart", "Chat")
+        
+        # Everything except the authenticated checks is independent of the login,
+        # so those probes overlap with it; the authenticated ones follow once
+        # AUTH is set. Output is buffered per test and printed in order.
+        outcomes = {}
+        load_cache()
+        try:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                futures = {
+                    name: executor.submit(run_captured, test)
+                    for name, test in tests.items()
+                    if name != "Login (Valid)" and name not in authed
+                }
+                outcomes["Login (Valid)"] = run_captured(test_login)
+                if AUTH:
+                    futures.update({
+                        name: executor.submit(run_captured, tests[name])
+                        for name in authed
+                    })
+                outcomes.update({name: future.result() for name, future in futures.items()})
+        finally:
+            SESSION.close()
+            save_cache()
+        
+        # Every test's output plus the summary goes out in one write
+        with captured_output() as report:
+            results = {}
+            for name in tests:
+                if name not in outcomes:
+                    results[name] = False
+                    continue
+                results[name], output = outcomes[name]
+                report.write(output)
+        
+            # Summary
+            print_section("TEST SUMMARY")
+            passed = sum(1 for v in results.values() if v)
+            total = len(results)
+        
+            print("\n".join(
+                f"{'✓ PASS' if result else '✗ FAIL':8} | {test}"
+                for test, result in results.items()
+            ))
+        
+            print("\n" + "-" * 60)
+            print(f"Results: {passed}/{total} tests passed")
+            print("=" * 60 + "\n")
+        
+            if passed == total:
+                print("🎉 All tests passed!")
+            else:
+                print("⚠️  Some tests failed. Check the output above.")
+        report.dump()
 
 
 if __name__ == '__main__':
     try:
         run_all_tests()
-    except requests.exceptions.ConnectionError:
-        print("\n❌ ERROR: Cannot connect to API")
-        print(f"Make sure the server is running at {BASE_URL}")
     except KeyboardInterrupt:
         print("\n\nTests interrupted by user")
     except Exception as e:
@@ -0,0 +1,9 @@
+"""
+WSGI entry point for production
+Run: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from app import app, init_assistant
+
+if not init_assistant():
+    raise RuntimeError("Failed to initialize assistant. Check your config.json and OCI credentials")